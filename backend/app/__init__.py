@@ -1,2 +1,8 @@
 # Backend application package
+import os
 
+# CPU thread pools are sized when torch/numpy first load, so pin them here,
+# before any service module imports torch. The model is a small MLP: scale with
+# uvicorn --workers N rather than intra-op threads. Override via environment.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
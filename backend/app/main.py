@@ -10,6 +10,7 @@ from app.routers import detect as detect_router
 from app.routers import account as account_router
 from app.routers.detect_blacklist_router import router as detect_bl_router
 from app.services.model_loader import load_model
+from app.services.etherscan_client import close_client as close_etherscan_client
 import logging
 import time
 
@@ -83,6 +84,11 @@ async def startup_event():
         logger.error(f"Failed to load model: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared HTTP connections"""
+    await close_etherscan_client()
+
 @app.get("/")
 def root():
     """Root endpoint"""
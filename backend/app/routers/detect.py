@@ -129,6 +129,7 @@ class DetectIn(BaseModel):
     explain: bool = Field(False, description="Include SHAP explanations")
     explain_with_llm: bool = Field(False, description="Include LLM explanations (requires explain=True)")
     max_transactions: int = Field(1000, description="Maximum number of transactions to fetch")
+    refresh: bool = Field(False, description="Bypass cached Etherscan data and fetch fresh transactions")
 
 class DetectTransactionIn(BaseModel):
     # Option 1: Manual analysis - provide transaction hash
@@ -244,7 +245,8 @@ async def _handle_account_detection(body: DetectIn):
         account_address=body.account_address,
         explain=body.explain,
         explain_with_llm=body.explain_with_llm,
-        max_transactions=body.max_transactions
+        max_transactions=body.max_transactions,
+        refresh=body.refresh
     )
     detection_time = time.time() - detection_start
     
@@ -7,15 +7,18 @@ Main service that orchestrates the detection flow:
 4. Gradient-based feature importance explanation
 5. LLM explanation
 """
+import asyncio
+import os
 import torch
 import numpy as np
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List
 from app.services.etherscan_client import get_account_transactions
 from app.services.rarible_client import enrich_transactions_with_nft_data, enrich_transaction_with_nft_data
 from app.services.feature_engineer import extract_account_level_features, extract_transaction_level_features
-from app.services.model_loader import get_model, get_feature_names, scale_features
+from app.services.model_loader import get_model, get_task_model, get_feature_names, scale_features
 from app.services.shap_explainer import SHAPExplainer
 from app.services.fast_feature_explainer import FastFeatureExplainer
 from app.services.llm_explainer import LLMExplainer
@@ -31,6 +34,8 @@ class DetectionService:
     def __init__(self):
         logger.info("Initializing DetectionService components...")
         self.model = get_model()
+        self.account_model = get_task_model('account')
+        self.transaction_model = get_task_model('transaction')
         self.account_feature_names, self.transaction_feature_names = get_feature_names()
         logger.info(f"Loaded {len(self.account_feature_names)} account features, {len(self.transaction_feature_names)} transaction features")
         
@@ -41,6 +46,18 @@ class DetectionService:
         # Keep SHAP as fallback option (not used by default)
         self.shap_explainer = None  # SHAPExplainer(self.model, device="cpu")
         
+        # Dedicated pool for CPU-bound explanations so they neither block the event
+        # loop nor compete with other work on the default executor. The explainer
+        # only takes input gradients, so calls can share the model across workers
+        # (see test_concurrent_explanations.py).
+        self._explain_pool = ThreadPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            thread_name_prefix="explainer"
+        )
+        
+        # In-flight account detections keyed by (address, options), for request coalescing
+        self._inflight_accounts: Dict[tuple, asyncio.Future] = {}
+        
         try:
             self.llm_explainer = LLMExplainer()
             logger.info("LLM explainer initialized successfully")
@@ -48,6 +65,28 @@ class DetectionService:
             logger.warning(f"LLM explainer not available: {e}")
             self.llm_explainer = None
     
+    @torch.inference_mode()
+    def _predict(self, features_scaled: np.ndarray, task_id: str) -> float:
+        """
+        Run the compiled task head on one scaled feature vector
+        
+        inference_mode (rather than no_grad) also skips version-counter and view
+        tracking. Grad mode is not disabled globally because the gradient-based
+        explainer needs autograd on the FP32 model.
+        
+        Returns: scam probability for 'account' or 'transaction'
+        """
+        features_tensor = torch.from_numpy(
+            np.ascontiguousarray(features_scaled.reshape(1, -1), dtype=np.float32)
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[DEBUG] Model input tensor shape: {features_tensor.shape}, dtype: {features_tensor.dtype}")
+            logger.debug(f"[DEBUG] Model input tensor range: [{features_tensor.min():.6f}, {features_tensor.max():.6f}]")
+        
+        task_model = self.account_model if task_id == 'account' else self.transaction_model
+        # Sigmoid is part of the traced graph, so the model returns the probability
+        return float(task_model(features_tensor))
+    
     async def detect_transaction(
         self,
         transaction_data: Dict[str, Any],
@@ -108,13 +147,8 @@ class DetectionService:
         
         # Make prediction using transaction-level model only
         model_start = time.time()
-        with torch.no_grad():
-            transaction_features_tensor = torch.tensor(transaction_features_scaled, dtype=torch.float32).unsqueeze(0)
-            logger.debug(f"[DEBUG] Model input tensor shape: {transaction_features_tensor.shape}, dtype: {transaction_features_tensor.dtype}")
-            logger.debug(f"[DEBUG] Model input tensor range: [{transaction_features_tensor.min():.6f}, {transaction_features_tensor.max():.6f}]")
-            transaction_logit = self.model(transaction_features_tensor, task_id='transaction').squeeze()
-            transaction_prob = float(torch.sigmoid(transaction_logit).item())
-        logger.info(f"[MODEL][TRANSACTION] logit={float(transaction_logit):.6f}, prob={transaction_prob:.6f}")
+        transaction_prob = self._predict(transaction_features_scaled, 'transaction')
+        logger.info(f"[MODEL][TRANSACTION] prob={transaction_prob:.6f}")
         logger.info(f"[DEBUG] Transaction hash: {transaction_data.get('transaction_hash', 'N/A')}")
         logger.info(f"[DEBUG] From: {transaction_data.get('from_address', 'N/A')}, To: {transaction_data.get('to_address', 'N/A')}")
         logger.info(f"[DEBUG] GasPrice: {transaction_data.get('gasPrice', 0)}, GasUsed: {transaction_data.get('gasUsed', 0)}, Value: {transaction_data.get('value', 0)}")
@@ -133,7 +167,9 @@ class DetectionService:
         # Generate feature importance explanations if requested
         if explain or explain_with_llm:
             explain_start = time.time()
-            transaction_explanation = self.feature_explainer.explain_prediction(
+            transaction_explanation = await asyncio.get_running_loop().run_in_executor(
+                self._explain_pool,
+                self.feature_explainer.explain_prediction,
                 transaction_features_scaled.reshape(1, -1),
                 'transaction',
                 self.transaction_feature_names
@@ -172,7 +208,7 @@ class DetectionService:
                         transaction_prob,
                         "transaction",
                         shap_like_explanation["feature_importance"],  # Use mapped version with shap_value
-                        max_words=100
+                        max_words=25
                     )
                     gemini_time = time.time() - gemini_start
                     logger.info(f"⏱️ [TIMING] Gemini API call: {gemini_time:.2f}s")
@@ -202,11 +238,51 @@ class DetectionService:
         account_address: str,
         explain: bool = False,
         explain_with_llm: bool = False,
-        max_transactions: int = 1000
+        max_transactions: int = 1000,
+        refresh: bool = False
     ) -> Dict[str, Any]:
         """
         Main detection function for an account address
         
+        Concurrent calls with the same address and options share a single
+        in-flight detection instead of each hitting Etherscan and the model.
+        """
+        key = (account_address.lower(), explain, explain_with_llm, max_transactions, refresh)
+        fut = self._inflight_accounts.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._detect_account_impl(
+                account_address,
+                explain=explain,
+                explain_with_llm=explain_with_llm,
+                max_transactions=max_transactions,
+                refresh=refresh
+            ))
+            self._inflight_accounts[key] = fut
+            fut.add_done_callback(lambda f: self._release_inflight_account(key, f))
+        else:
+            logger.info(f"Joining in-flight account detection for {account_address}")
+        # shield: a cancelled caller must not cancel the detection other callers are waiting on
+        return await asyncio.shield(fut)
+
+    def _release_inflight_account(self, key: tuple, fut: asyncio.Future) -> None:
+        """Done-callback for an in-flight detection: release the key and retrieve its exception."""
+        self._inflight_accounts.pop(key, None)
+        if not fut.cancelled():
+            # Mark the exception retrieved so a failure nobody awaited (every waiter
+            # cancelled) doesn't log "Task exception was never retrieved"
+            fut.exception()
+
+    async def _detect_account_impl(
+        self,
+        account_address: str,
+        explain: bool = False,
+        explain_with_llm: bool = False,
+        max_transactions: int = 1000,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Run the account detection pipeline
+        
         Flow:
         1. Fetch transactions from Etherscan (ERC20, ERC721, ERC1155)
         2. Enrich with NFT data from Rarible
@@ -220,7 +296,7 @@ class DetectionService:
         
         # Step 1: Fetch transactions from Etherscan
         etherscan_start = time.time()
-        all_transactions = await get_account_transactions(account_address, max_txns=max_transactions)
+        all_transactions = await get_account_transactions(account_address, max_txns=max_transactions, refresh=refresh)
         etherscan_time = time.time() - etherscan_start
         logger.info(f"⏱️ [TIMING] Etherscan API ({len(all_transactions)} transactions): {etherscan_time:.2f}s")
         
@@ -266,17 +342,8 @@ class DetectionService:
         
         # Step 5: Make account prediction only
         model_start = time.time()
-        with torch.no_grad():
-            account_features_tensor = torch.tensor(account_features_scaled, dtype=torch.float32).unsqueeze(0)
-            
-            account_logit = self.model(account_features_tensor, task_id='account').squeeze()
-            
-            account_prob = float(torch.sigmoid(account_logit).item())
-        logger.info(
-            "[MODEL][ACCOUNT] logit=%.6f, prob=%.6f",
-            float(account_logit),
-            account_prob,
-        )
+        account_prob = self._predict(account_features_scaled, 'account')
+        logger.info("[MODEL][ACCOUNT] prob=%.6f", account_prob)
         model_time = time.time() - model_start
         logger.info(f"⏱️ [TIMING] Model inference (account): {model_time:.3f}s")
         
@@ -291,7 +358,9 @@ class DetectionService:
         # Step 6: Generate feature importance explanations if requested
         if explain or explain_with_llm:
             explain_start = time.time()
-            account_explanation = self.feature_explainer.explain_prediction(
+            account_explanation = await asyncio.get_running_loop().run_in_executor(
+                self._explain_pool,
+                self.feature_explainer.explain_prediction,
                 account_features_scaled.reshape(1, -1),
                 'account',
                 self.account_feature_names
@@ -331,7 +400,7 @@ class DetectionService:
                         account_prob,
                         "account",
                         account_shap_like["feature_importance"],  # Use mapped version with shap_value
-                        max_words=100
+                        max_words=25
                     )
                     account_gemini_time = time.time() - gemini_start
                     logger.info(f"⏱️ [TIMING] Gemini API (account): {account_gemini_time:.2f}s")
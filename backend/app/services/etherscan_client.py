@@ -2,12 +2,49 @@
 Etherscan API Client
 Fetches transaction data from Etherscan API
 """
+import asyncio
 import itertools
+import math
+import threading
+import time
 import httpx
-from typing import Optional, Dict, Any, List
+import orjson
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from app.config import settings
 
-_cycle = itertools.cycle(settings.etherscan_keys or [settings.etherscan_api_key])
+# Round-robin API key rotation; the lock keeps the counter safe on free-threaded builds
+_keys = settings.etherscan_keys or [settings.etherscan_api_key]
+_key_counter = itertools.count()
+_key_lock = threading.Lock()
+
+def _next_key() -> str:
+    """Pick the next Etherscan API key"""
+    with _key_lock:
+        i = next(_key_counter)
+    return _keys[i % len(_keys)]
+
+# Shared client so keep-alive connections are reused across requests
+_client: Optional[httpx.AsyncClient] = None
+
+async def get_client() -> httpx.AsyncClient:
+    """Get the shared Etherscan client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url="https://api.etherscan.io/v2",
+            timeout=15.0,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32),
+        )
+    return _client
+
+async def close_client() -> None:
+    """Close the shared Etherscan client (called on app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 async def etherscan_get(module: str, action: str, chainid: Optional[int] = None, **params) -> Dict[str, Any]:
     """Send GET request to Etherscan API v2
@@ -20,12 +57,12 @@ async def etherscan_get(module: str, action: str, chainid: Optional[int] = None,
     """
     if chainid is None:
         chainid = settings.etherscan_chainid
-    key = next(_cycle) if settings.etherscan_keys else settings.etherscan_api_key
+    key = _next_key()
     q = {"module": module, "action": action, "apikey": key, "chainid": chainid, **params}
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        r = await client.get("https://api.etherscan.io/v2/api", params=q)
-        r.raise_for_status()
-        return r.json()
+    client = await get_client()
+    r = await client.get("/api", params=q)
+    r.raise_for_status()
+    return orjson.loads(r.content)
 
 async def get_transaction_list(address: str, startblock: int = 0, endblock: int = 99999999, 
                               page: int = 1, offset: int = 100, sort: str = "desc", chainid: Optional[int] = None) -> Dict[str, Any]:
@@ -87,7 +124,9 @@ def _hex_to_int(x: Optional[str]) -> int:
     if not x:
         return 0
     try:
-        return int(x, 16) if isinstance(x, str) and x.startswith("0x") else int(x)
+        # int(x, 16) accepts the 0x/0X prefix itself and is faster than
+        # int.from_bytes(bytes.fromhex(...)) for hex quantities of any width
+        return int(x, 16) if isinstance(x, str) and x[:2] in ("0x", "0X") else int(x)
     except Exception:
         return 0
 
@@ -104,41 +143,78 @@ SIG_MAP = {
     "0x2eb2c2d6": ("safeTransferFrom", "erc1155"),
 }
 
+# Same mapping keyed by the raw 4-byte selector; bytes.fromhex accepts either hex case
+_SIG_MAP_BYTES = {bytes.fromhex(k[2:]): v for k, v in SIG_MAP.items()}
+_NO_SIGNATURE = (None, None)
+
+def _lookup_selector(input_data: Optional[str]) -> tuple:
+    """Look up the (function name, token standard) entry for the input's 4-byte selector."""
+    if not input_data or len(input_data) < 10 or input_data[:2] not in ("0x", "0X"):
+        return _NO_SIGNATURE
+    try:
+        sel = bytes.fromhex(input_data[2:10])
+    except ValueError:
+        return _NO_SIGNATURE
+    return _SIG_MAP_BYTES.get(sel, _NO_SIGNATURE)
+
 def decode_function_name(input_data: Optional[str]) -> List[str]:
     """Decode function name from input data"""
-    if not input_data or len(input_data) < 10:
-        return []
-    sel = input_data[:10].lower()
-    name = SIG_MAP.get(sel, (None,))[0]
+    name = _lookup_selector(input_data)[0]
     return [name] if name else []
 
 def _get_token_type_from_input(input_data: Optional[str]) -> Optional[str]:
     """Infer token standard from function selector."""
-    if not input_data or len(input_data) < 10:
-        return None
-    sel = input_data[:10].lower()
-    return SIG_MAP.get(sel, (None, None))[1]
+    return _lookup_selector(input_data)[1]
 
 def _safe_int(value: Any) -> int:
     """Parse decimal or hex string into int."""
+    # Fast path: Etherscan account endpoints return plain decimal strings
+    if type(value) is str and value.isdecimal():
+        return int(value)
     if value in (None, "", "0x", "0X"):
         return 0
     try:
         value = str(value)
-        if value.lower().startswith("0x"):
+        if value[:2] in ("0x", "0X"):
             return int(value, 16)
         return int(value, 10)
     except (ValueError, TypeError):
         return 0
 
-async def _fetch_token_transactions(address: str, action: str, tx_type: str, max_txns: int, chainid: Optional[int]) -> List[Dict[str, Any]]:
-    """Fetch token transfers of a specific standard for an address."""
+# NFT fields are filled in later by Rarible enrichment
+_NFT_DEFAULT_FIELDS = {
+    "nft_floor_price": 0,
+    "nft_average_price": 0,
+    "nft_total_volume": 0,
+    "nft_total_sales": 0,
+    "nft_num_owners": 0,
+    "nft_market_cap": 0,
+    "nft_7day_volume": 0,
+    "nft_7day_sales": 0,
+    "nft_7day_avg_price": 0,
+}
+
+def _is_complete_page(result: Dict[str, Any]) -> bool:
+    """True for a successful page or Etherscan's "No transactions found" (status 0, empty result)."""
+    if result.get("status") == "1":
+        return True
+    return str(result.get("message", "")).startswith("No transactions found")
+
+async def _fetch_token_transactions(address: str, action: str, tx_type: str, max_txns: int,
+                                    chainid: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Fetch token transfers of a specific standard for an address.
+    
+    Returns:
+        (transactions, complete) - complete is False if any consumed page was an
+        Etherscan error (e.g. rate limit), in which case the list may be truncated
+    """
     transactions: List[Dict[str, Any]] = []
-    page = 1
-    offset = 100
+    if max_txns <= 0:
+        return transactions, True
+    offset = min(100, max_txns)
     
-    while len(transactions) < max_txns:
-        result = await etherscan_get(
+    async def fetch_page(page: int) -> Dict[str, Any]:
+        return await etherscan_get(
             "account",
             action,
             chainid=chainid,
@@ -147,77 +223,131 @@ async def _fetch_token_transactions(address: str, action: str, tx_type: str, max
             offset=offset,
             sort="desc"
         )
-        
+    
+    # Request all pages concurrently, then consume them in order
+    n_pages = math.ceil(max_txns / offset)
+    pages = await asyncio.gather(*[fetch_page(p) for p in range(1, n_pages + 1)])
+    
+    complete = True
+    for result in pages:
         if result.get("status") != "1":
+            complete = _is_complete_page(result)
             break
         
         txns = result.get("result", [])
         if not isinstance(txns, list) or not txns:
             break
         
-        for txn in txns:
-            if len(transactions) >= max_txns:
-                break
-            
-            selector_type = _get_token_type_from_input(txn.get("input"))
-            inferred_type = selector_type or tx_type
+        for txn in txns[:max_txns - len(transactions)]:
+            function_name, selector_type = _lookup_selector(txn.get("input"))
+            to_address = (txn.get("to") or "").lower()
             
             formatted_txn = {
                 "from_address": (txn.get("from") or "").lower(),
-                "to_address": (txn.get("to") or "").lower(),
+                "to_address": to_address,
                 "value": _safe_int(txn.get("value")),
                 "gasPrice": _safe_int(txn.get("gasPrice")),
                 "gasUsed": _safe_int(txn.get("gasUsed")),
                 "timestamp": _safe_int(txn.get("timeStamp")),
-                "function_call": decode_function_name(txn.get("input")),
+                "function_call": [function_name] if function_name else [],
                 "transaction_hash": txn.get("hash", ""),
                 "blockNumber": _safe_int(txn.get("blockNumber")),
-                "contract_address": (txn.get("contractAddress") or txn.get("to") or "").lower(),
+                "contract_address": (txn.get("contractAddress") or "").lower() or to_address,
                 "token_value": _safe_int(txn.get("tokenValue") or txn.get("value")),
                 "token_decimal": _safe_int(txn.get("tokenDecimal")),
                 "token_id": txn.get("tokenID"),
-                "nft_floor_price": 0,
-                "nft_average_price": 0,
-                "nft_total_volume": 0,
-                "nft_total_sales": 0,
-                "nft_num_owners": 0,
-                "nft_market_cap": 0,
-                "nft_7day_volume": 0,
-                "nft_7day_sales": 0,
-                "nft_7day_avg_price": 0,
-                "tx_type": inferred_type or tx_type,
+                **_NFT_DEFAULT_FIELDS,
+                "tx_type": selector_type or tx_type,
             }
             transactions.append(formatted_txn)
         
-        if len(txns) < offset:
+        if len(txns) < offset or len(transactions) >= max_txns:
             break
-        
-        page += 1
     
-    return transactions
+    return transactions, complete
 
-async def get_account_transactions(address: str, max_txns: int = 1000, chainid: Optional[int] = None) -> List[Dict[str, Any]]:
-    """
-    Get ERC20/ERC721/ERC1155 transactions for an account address and format them for model input.
+# LRU + TTL cache for formatted account transactions: (address, chainid) -> (expires_at, transactions)
+ACCOUNT_TXNS_CACHE_TTL = 60.0
+ACCOUNT_TXNS_CACHE_MAXSIZE = 4096
+_ACCOUNT_TXNS_CACHE: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+# In-flight fetches, so concurrent requests for the same key share one set of API calls
+_ACCOUNT_TXNS_INFLIGHT: Dict[Tuple[str, int], asyncio.Future] = {}
+
+def _store_account_transactions(key: Tuple[str, int], fut: asyncio.Future) -> None:
+    """Done-callback for an in-flight fetch: release the key and cache complete results."""
+    _ACCOUNT_TXNS_INFLIGHT.pop(key, None)
+    if fut.cancelled() or fut.exception() is not None:
+        return
+    transactions, complete = fut.result()
+    if not complete:
+        # Don't pin a rate-limited/errored (possibly empty) result for the whole TTL
+        return
     
-    Args:
-        address: Ethereum address
-        max_txns: Maximum number of transactions per token type (ERC20, ERC721, ERC1155)
-        chainid: Chain ID (1 for Ethereum mainnet)
+    _ACCOUNT_TXNS_CACHE.pop(key, None)
+    
+    # Drop expired entries first, then evict least recently used ones
+    now = time.monotonic()
+    for stale in [k for k, (expires_at, _) in _ACCOUNT_TXNS_CACHE.items() if expires_at <= now]:
+        del _ACCOUNT_TXNS_CACHE[stale]
+    while len(_ACCOUNT_TXNS_CACHE) >= ACCOUNT_TXNS_CACHE_MAXSIZE:
+        _ACCOUNT_TXNS_CACHE.popitem(last=False)
+    _ACCOUNT_TXNS_CACHE[key] = (now + ACCOUNT_TXNS_CACHE_TTL, transactions)
+
+async def _fetch_account_transactions(address: str, chainid: Optional[int]) -> Tuple[List[Dict[str, Any]], bool]:
+    """Fetch and combine ERC20/ERC721/ERC1155 transfers for an account (uncached).
     
     Returns:
-        Combined list of transactions: max 10 ERC20 + max 10 ERC721 + max 10 ERC1155
+        (transactions, complete) - complete is False if any token type hit an Etherscan error
     """
     # Fetch max 10 transactions for each token type
     max_per_type = 10
-    erc20 = await _fetch_token_transactions(address, "tokentx", "erc20", max_per_type, chainid)
-    erc721 = await _fetch_token_transactions(address, "tokennfttx", "erc721", max_per_type, chainid)
-    erc1155 = await _fetch_token_transactions(address, "token1155tx", "erc1155", max_per_type, chainid)
+    (erc20, ok20), (erc721, ok721), (erc1155, ok1155) = await asyncio.gather(
+        _fetch_token_transactions(address, "tokentx", "erc20", max_per_type, chainid),
+        _fetch_token_transactions(address, "tokennfttx", "erc721", max_per_type, chainid),
+        _fetch_token_transactions(address, "token1155tx", "erc1155", max_per_type, chainid),
+    )
     
     # Combine all transactions and sort by timestamp (newest first)
     combined = erc20 + erc721 + erc1155
     combined.sort(key=lambda tx: tx.get("timestamp", 0), reverse=True)
     
     # Return all combined transactions (max 30 total: 10 + 10 + 10)
-    return combined
+    return combined, ok20 and ok721 and ok1155
 
+async def get_account_transactions(address: str, max_txns: int = 1000, chainid: Optional[int] = None,
+                                   refresh: bool = False) -> List[Dict[str, Any]]:
+    """
+    Get ERC20/ERC721/ERC1155 transactions for an account address and format them for model input.
+    
+    Results are cached for ACCOUNT_TXNS_CACHE_TTL seconds (only when every Etherscan page
+    succeeded), and concurrent calls for the same address share a single Etherscan fetch.
+    
+    Args:
+        address: Ethereum address
+        max_txns: Unused; fetching is capped at 10 transactions per token type
+        chainid: Chain ID (1 for Ethereum mainnet)
+        refresh: Bypass the cache and fetch fresh data from Etherscan
+    
+    Returns:
+        Combined list of transactions: max 10 ERC20 + max 10 ERC721 + max 10 ERC1155
+    """
+    key = (address.lower(), chainid if chainid is not None else settings.etherscan_chainid)
+    
+    cached = None if refresh else _ACCOUNT_TXNS_CACHE.get(key)
+    if cached is not None and cached[0] <= time.monotonic():
+        del _ACCOUNT_TXNS_CACHE[key]
+        cached = None
+    if cached is not None:
+        _ACCOUNT_TXNS_CACHE.move_to_end(key)
+        transactions = cached[1]
+    else:
+        fut = _ACCOUNT_TXNS_INFLIGHT.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(_fetch_account_transactions(address, chainid))
+            _ACCOUNT_TXNS_INFLIGHT[key] = fut
+            fut.add_done_callback(lambda f: _store_account_transactions(key, f))
+        # shield: a cancelled caller must not cancel the fetch other callers are waiting on
+        transactions, _ = await asyncio.shield(fut)
+    
+    # Callers enrich transactions in place, so hand out copies of the cached dicts
+    return [dict(tx) for tx in transactions]
@@ -54,17 +54,13 @@ class FastFeatureExplainer:
         if X.shape[0] > 1:
             # Use first sample for explanation
             target_output = output[0]
-            target_X = X[0:1]
         else:
             target_output = output
-            target_X = X
         
-        # Backward pass to get gradients
-        self.model.zero_grad()
-        target_output.backward(retain_graph=True)
-        
-        # Get gradients w.r.t. input features
-        gradients = target_X.grad
+        # Gradients w.r.t. input features only. autograd.grad never writes the
+        # parameters' .grad, so concurrent calls on the shared model do not race
+        # (zero_grad/backward from several threads crashes the process).
+        gradients = torch.autograd.grad(target_output, X)[0][0:1]
         
         # Calculate feature importance as absolute gradient values
         # Higher gradient = more important feature
@@ -133,12 +129,10 @@ class FastFeatureExplainer:
         importance_scores_list = []
         
         for i in range(X.shape[0]):
-            self.model.zero_grad()
             sample_output = output[i] if output.ndim > 0 else output
-            sample_X = X[i:i+1]
             
-            sample_output.backward(retain_graph=True, create_graph=False)
-            gradients = sample_X.grad
+            # Input gradient only, leaving the shared parameters' .grad untouched
+            gradients = torch.autograd.grad(sample_output, X, retain_graph=True)[0][i:i+1]
             importance_scores = torch.abs(gradients).squeeze().cpu().detach().numpy()
             
             if importance_scores.ndim == 0:
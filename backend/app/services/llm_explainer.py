@@ -3,7 +3,10 @@ LLM Explainer using Google Gemini API
 Provides natural language explanations for model predictions based on SHAP values
 """
 import google.generativeai as genai
+import bisect
+import json
 import logging
+import re
 import time
 from typing import Dict, List, Optional, Any
 from app.config import settings
@@ -12,6 +15,80 @@ logger = logging.getLogger(__name__)
 
 
 class LLMExplainer:
+    # Technical feature names -> human-readable descriptions
+    _FEATURE_TRANSLATIONS = {
+        "avg_gas_price": "average transaction fee",
+        "activity_duration_days": "account age in days",
+        "std_time_between_txns": "irregularity in transaction timing",
+        "total_volume": "total amount transferred",
+        "inNeighborNum": "number of unique senders",
+        "total_txn": "total number of transactions",
+        "in_out_ratio": "ratio of incoming to outgoing transactions",
+        "total_value_in": "total amount received",
+        "outNeighborNum": "number of unique recipients",
+        "avg_gas_used": "average transaction complexity",
+        "giftinTxn_ratio": "proportion of token transfers",
+        "miningTxnNum": "number of mining transactions",
+        "avg_value_out": "average amount sent",
+        "turnover_ratio": "frequency of fund movements",
+        "out_txn": "number of outgoing transactions",
+        "gas_price": "transaction fee",
+        "gas_used": "transaction complexity",
+        "value": "transaction amount",
+        "num_functions": "number of contract interactions",
+        "has_suspicious_func": "presence of suspicious functions",
+        "nft_num_owners": "number of NFT owners",
+        "nft_total_sales": "total NFT sales volume",
+        "token_value": "token transfer value",
+        "nft_total_volume": "total NFT trading volume",
+        "is_mint": "is a new token creation",
+        "high_gas": "high transaction fee",
+        "nft_average_price": "average NFT price",
+        "nft_floor_price": "minimum NFT price",
+        "nft_market_cap": "total NFT market value",
+        "is_zero_value": "zero-value transaction"
+    }
+    
+    # Prompt skeleton, filled with str.format per request (literal JSON braces are doubled)
+    _PROMPT_TEMPLATE = """You are a Web3 security expert analyzing {task_type} risk for NFT phishing detection.
+
+Context:
+- Risk Level: {prediction_prob:.1%} ({risk_level})
+- Feature: {feature_name}
+- Feature Value: {formatted_value} (this value already includes the unit - use it as-is in your explanation)
+- Impact: {impact}
+
+Task: Write a natural, flowing explanation that EMBEDS the feature value WITH ITS UNIT ({formatted_value}) directly into the sentence. The explanation should read naturally like a complete sentence.
+
+IMPORTANT: The value {formatted_value} already includes the unit (e.g., "2.5 gwei", "0.001 ETH", "10 days"). Use the value WITH the unit in your explanation.
+
+Examples of good explanations:
+- "This account has an average transaction fee of {formatted_value}, which may indicate an attacker rushing to execute transactions before detection."
+- "This transaction has a value of 0 ETH, suggesting it may be a phishing attempt to steal NFTs through approval scams."
+- "The account has been active for {formatted_value}, which is unusually short for a legitimate account."
+- "This account has {formatted_value} total transactions, indicating potential malicious activity."
+
+Guidelines:
+- ALWAYS include the unit when mentioning the value (e.g., "has {formatted_value}", "shows {formatted_value}", "with {formatted_value}")
+- The value {formatted_value} already has the unit, so use it exactly as provided
+- Explain WHY this value is suspicious or safe
+- Reference common phishing/scam patterns
+- Keep it concise (max 25 words)
+- Write as a complete, flowing sentence - NOT separate value and explanation
+
+Return ONLY valid JSON, no markdown, no other text:
+{{
+  "reason": "Your natural explanation with value and unit embedded"
+}}"""
+    
+    # prob > 0.7 -> HIGH, prob > 0.4 -> MEDIUM, else LOW (bisect_left keeps the bounds exclusive)
+    _RISK_THRESHOLDS = (0.4, 0.7)
+    _RISK_LABELS = ("LOW", "MEDIUM", "HIGH")
+    
+    # Opening of the "reason" value in a possibly truncated JSON response. Only
+    # complete escapes are matched, so the captured body always decodes.
+    _PARTIAL_REASON_RE = re.compile(r'"reason"\s*:\s*"((?:[^"\\]|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*)')
+    
     def __init__(self, api_key: Optional[str] = None):
         api_key = api_key or settings.gemini_api_key
         if not api_key:
@@ -21,48 +98,15 @@ class LLMExplainer:
         
     def _translate_feature_name(self, name: str) -> str:
         """Translate technical feature names to human-readable descriptions"""
-        translations = {
-            "avg_gas_price": "average transaction fee",
-            "activity_duration_days": "account age in days",
-            "std_time_between_txns": "irregularity in transaction timing",
-            "total_volume": "total amount transferred",
-            "inNeighborNum": "number of unique senders",
-            "total_txn": "total number of transactions",
-            "in_out_ratio": "ratio of incoming to outgoing transactions",
-            "total_value_in": "total amount received",
-            "outNeighborNum": "number of unique recipients",
-            "avg_gas_used": "average transaction complexity",
-            "giftinTxn_ratio": "proportion of token transfers",
-            "miningTxnNum": "number of mining transactions",
-            "avg_value_out": "average amount sent",
-            "turnover_ratio": "frequency of fund movements",
-            "out_txn": "number of outgoing transactions",
-            "gas_price": "transaction fee",
-            "gas_used": "transaction complexity",
-            "value": "transaction amount",
-            "num_functions": "number of contract interactions",
-            "has_suspicious_func": "presence of suspicious functions",
-            "nft_num_owners": "number of NFT owners",
-            "nft_total_sales": "total NFT sales volume",
-            "token_value": "token transfer value",
-            "nft_total_volume": "total NFT trading volume",
-            "is_mint": "is a new token creation",
-            "high_gas": "high transaction fee",
-            "nft_average_price": "average NFT price",
-            "nft_floor_price": "minimum NFT price",
-            "nft_market_cap": "total NFT market value",
-            "is_zero_value": "zero-value transaction"
-        }
-        return translations.get(name, name)
+        return self._FEATURE_TRANSLATIONS.get(name, name)
     
     def _format_features_for_prompt(self, features: List[Dict]) -> str:
         """Format feature importance data for the prompt"""
-        formatted = []
-        for f in features:
-            feature_name = self._translate_feature_name(f["feature_name"])
-            impact = "increasing risk" if f["shap_value"] > 0 else "decreasing risk"
-            formatted.append(f"- {feature_name} (value={f['feature_value']:.2f}): {impact}, importance={abs(f['shap_value']):.4f}")
-        return "\n".join(formatted)
+        return "\n".join(
+            f"- {self._translate_feature_name(f['feature_name'])} (value={f['feature_value']:.2f}): "
+            f"{'increasing risk' if f['shap_value'] > 0 else 'decreasing risk'}, importance={abs(f['shap_value']):.4f}"
+            for f in features
+        )
     
     async def explain_top_features(self, 
                                    prediction_prob: float,
@@ -86,7 +130,7 @@ class LLMExplainer:
                 "reason": "High gas price indicates potential scam..."
             }
         """
-        risk_level = "HIGH" if prediction_prob > 0.7 else ("MEDIUM" if prediction_prob > 0.4 else "LOW")
+        risk_level = self._RISK_LABELS[bisect.bisect_left(self._RISK_THRESHOLDS, prediction_prob)]
         
         # Get top feature only (most important)
         top_feature = top_features[0] if top_features else None
@@ -104,57 +148,55 @@ class LLMExplainer:
         # Format feature value for natural language
         formatted_value = self._format_feature_value(top_feature['feature_name'], feature_value)
         
-        prompt = f"""You are a Web3 security expert analyzing {task_type} risk for NFT phishing detection.
-
-Context:
-- Risk Level: {prediction_prob:.1%} ({risk_level})
-- Feature: {feature_name}
-- Feature Value: {formatted_value} (this value already includes the unit - use it as-is in your explanation)
-- Impact: {impact}
-
-Task: Write a natural, flowing explanation that EMBEDS the feature value WITH ITS UNIT ({formatted_value}) directly into the sentence. The explanation should read naturally like a complete sentence.
-
-IMPORTANT: The value {formatted_value} already includes the unit (e.g., "2.5 gwei", "0.001 ETH", "10 days"). Use the value WITH the unit in your explanation.
-
-Examples of good explanations:
-- "This account has an average transaction fee of {formatted_value}, which may indicate an attacker rushing to execute transactions before detection."
-- "This transaction has a value of 0 ETH, suggesting it may be a phishing attempt to steal NFTs through approval scams."
-- "The account has been active for {formatted_value}, which is unusually short for a legitimate account."
-- "This account has {formatted_value} total transactions, indicating potential malicious activity."
-
-Guidelines:
-- ALWAYS include the unit when mentioning the value (e.g., "has {formatted_value}", "shows {formatted_value}", "with {formatted_value}")
-- The value {formatted_value} already has the unit, so use it exactly as provided
-- Explain WHY this value is suspicious or safe
-- Reference common phishing/scam patterns
-- Keep it concise (max 25 words)
-- Write as a complete, flowing sentence - NOT separate value and explanation
-
-Return ONLY valid JSON, no markdown, no other text:
-{{
-  "reason": "Your natural explanation with value and unit embedded"
-}}"""
+        prompt = self._PROMPT_TEMPLATE.format(
+            task_type=task_type,
+            prediction_prob=prediction_prob,
+            risk_level=risk_level,
+            feature_name=feature_name,
+            formatted_value=formatted_value,
+            impact=impact,
+        )
 
         try:
             api_start = time.time()
-            response = self.model.generate_content(
+            # Stream the response and stop reading once the reason exceeds the word budget
+            response_stream = await self.model.generate_content_async(
                 prompt,
                 generation_config={
                     "temperature": 0.3,
                     "max_output_tokens": 100,
-                }
+                },
+                stream=True
             )
+            chunks = []
+            chunk_iter = response_stream.__aiter__()
+            try:
+                async for chunk in chunk_iter:
+                    try:
+                        chunks.append(chunk.text)
+                    except ValueError:
+                        # Chunk without text parts (e.g. the final finish/safety chunk)
+                        continue
+                    # Count only the reason's words, not the JSON around them. Stop
+                    # once there are more than max_words, so the first max_words are
+                    # complete and the last one is not cut mid-word.
+                    partial = self._PARTIAL_REASON_RE.search("".join(chunks))
+                    if partial and len(partial.group(1).split()) > max_words:
+                        break
+            finally:
+                # Release the underlying stream when we stop reading early
+                aclose = getattr(chunk_iter, "aclose", None)
+                if aclose is not None:
+                    await aclose()
             api_time = time.time() - api_start
+            raw_text = "".join(chunks)
             logger.debug(f"⏱️ [TIMING] Gemini API generate_content ({task_type}): {api_time:.2f}s")
             logger.debug(f"[DEBUG] Gemini prompt: {prompt}")
-            logger.debug(f"[DEBUG] Gemini raw response: {response.text[:200]}")
+            logger.debug(f"[DEBUG] Gemini raw response: {raw_text[:200]}")
             
-            explanation_text = response.text.strip()
+            explanation_text = raw_text.strip()
             
             # Try to extract JSON from response
-            import json
-            import re
-            
             # Remove markdown code blocks if present
             explanation_text = re.sub(r'```json\s*', '', explanation_text)
             explanation_text = re.sub(r'```\s*', '', explanation_text)
@@ -163,7 +205,7 @@ Return ONLY valid JSON, no markdown, no other text:
             try:
                 # Try to parse as JSON
                 json_data = json.loads(explanation_text)
-                reason = json_data.get('reason', '')
+                reason = self._truncate_words(json_data.get('reason', ''), max_words)
                 
                 # Format feature value based on type
                 formatted_value = self._format_feature_value(top_feature['feature_name'], feature_value)
@@ -176,6 +218,17 @@ Return ONLY valid JSON, no markdown, no other text:
                     "reason": reason
                 }
             except json.JSONDecodeError:
+                # A stream cut at the word budget leaves the JSON unterminated;
+                # recover the partial reason string if there is one
+                partial = self._PARTIAL_REASON_RE.search(explanation_text)
+                if partial and partial.group(1).strip():
+                    reason = self._truncate_words(json.loads('"' + partial.group(1) + '"', strict=False), max_words)
+                    return {
+                        "feature_name": feature_name,
+                        "feature_value": formatted_value,
+                        "reason": reason
+                    }
+                
                 # If not valid JSON, use fallback
                 logger.warning(f"Failed to parse Gemini JSON response: {explanation_text[:100]}")
                 formatted_value = self._format_feature_value(top_feature['feature_name'], feature_value)
@@ -196,6 +249,16 @@ Return ONLY valid JSON, no markdown, no other text:
                 "reason": f"This {feature_name} value ({formatted_value}) is {risk_desc}."
             }
     
+    @staticmethod
+    def _truncate_words(text: str, max_words: int) -> str:
+        """Cap text at max_words words (the stream budget only stops reading, it may overshoot)"""
+        if not isinstance(text, str):
+            return text
+        words = text.split()
+        if len(words) <= max_words:
+            return text.strip()
+        return " ".join(words[:max_words])
+    
     def _format_feature_value(self, feature_name: str, value: float) -> str:
         """Format feature value with units for display"""
         # Handle invalid/negative values
@@ -19,6 +19,26 @@ class SHAPModelWrapper(nn.Module):
         return self.model(x, task_id=self.task_id)
 
 
+class TaskModelWrapper(nn.Module):
+    """Wrap MTL_MLP to a single-task forward(x) so each head can be traced on its own.
+
+    With apply_sigmoid=True the wrapper returns probabilities of shape (B,)
+    instead of logits, so the sigmoid is fused into the traced graph.
+    """
+    def __init__(self, model: nn.Module, task_id: str, apply_sigmoid: bool = False):
+        super().__init__()
+        self.model = model
+        self.task_id = task_id
+        self.apply_sigmoid = apply_sigmoid
+        self.eval()
+
+    def forward(self, x):
+        out = self.model(x, task_id=self.task_id)
+        if self.apply_sigmoid:
+            out = torch.sigmoid(out).squeeze(-1)
+        return out
+
+
 class MTL_MLP(nn.Module):
     def __init__(self, input_dim=15, shared_dim=128, head_hidden_dim=64):
         super(MTL_MLP, self).__init__()
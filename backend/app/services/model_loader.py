@@ -8,11 +8,12 @@ import json
 import numpy as np
 from typing import Dict, Any, Tuple, List
 from sklearn.preprocessing import StandardScaler
-from app.services.model import MTL_MLP
+from app.services.model import MTL_MLP, TaskModelWrapper
 from app.config import settings
 
 # Global model instance
 _model_instance = None
+_task_models = {}  # task_id -> traced + frozen single-task inference module
 _account_feature_names = None
 _transaction_feature_names = None
 _account_scaler = None
@@ -50,6 +51,25 @@ def load_training_statistics() -> dict:
     print("⚠️  Training statistics file not found. Using fallback scaling.")
     return None
 
+def compile_task_model(model: torch.nn.Module, task_id: str, input_dim: int = 15) -> torch.nn.Module:
+    """
+    Trace and freeze a single task head of the model with TorchScript
+    
+    Freezing inlines the weights as constants so the per-request call skips
+    Python dispatch of the MTL_MLP forward and task_id branching. The sigmoid
+    is traced in, so the returned module maps (B, input_dim) -> probabilities (B,).
+    Returns: frozen ScriptModule, or the eager wrapper if tracing fails
+    """
+    wrapper = TaskModelWrapper(model, task_id, apply_sigmoid=True)
+    example = torch.zeros(1, input_dim)
+    try:
+        with torch.no_grad():
+            traced = torch.jit.trace(wrapper, example)
+            return torch.jit.freeze(traced)
+    except Exception as e:
+        print(f"⚠️  TorchScript tracing failed for {task_id} head, using eager model: {e}")
+        return wrapper
+
 def load_model() -> Tuple[MTL_MLP, List[str], List[str]]:
     """
     Load model and feature names at startup
@@ -60,6 +80,17 @@ def load_model() -> Tuple[MTL_MLP, List[str], List[str]]:
     if _model_instance is not None:
         return _model_instance, _account_feature_names, _transaction_feature_names
     
+    # Pin torch threading before any tensor is created. For a small MLP, contention
+    # between OpenMP threads costs more than it saves; throughput comes from
+    # uvicorn worker processes instead. OMP_NUM_THREADS (default 1, see
+    # app/__init__.py) overrides the intra-op count.
+    torch.set_num_threads(max(1, int(os.environ.get("OMP_NUM_THREADS") or 1)))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before inter-op work has started
+        pass
+    
     # Load training statistics
     load_training_statistics()
     
@@ -84,8 +115,14 @@ def load_model() -> Tuple[MTL_MLP, List[str], List[str]]:
         head_hidden_dim=64
     )
     
-    # Load model weights robustly
-    ckpt = torch.load(MODEL_PATH, map_location=torch.device('cpu'))
+    # Load model weights robustly. mmap keeps tensor storage backed by the file, so
+    # multiple uvicorn workers share the weights through the page cache.
+    try:
+        ckpt = torch.load(MODEL_PATH, map_location=torch.device('cpu'), mmap=True, weights_only=True)
+    except Exception as e:
+        # Legacy (non-zipfile) checkpoints or pickled extras cannot be mmap/weights_only loaded
+        print(f"⚠️  mmap checkpoint load failed, falling back to full load: {e}")
+        ckpt = torch.load(MODEL_PATH, map_location=torch.device('cpu'))
     # support checkpoints that wrap state dict
     if isinstance(ckpt, dict):
         if 'state_dict' in ckpt:
@@ -103,9 +140,15 @@ def load_model() -> Tuple[MTL_MLP, List[str], List[str]]:
         new_k = k.replace('module.', '') if k.startswith('module.') else k
         new_state[new_k] = v
     
-    model.load_state_dict(new_state)
+    # assign=True makes the parameters reference the loaded (mmap-backed) tensors
+    model.load_state_dict(new_state, strict=True, assign=True)
     model.eval()
     
+    task_models = {
+        task_id: compile_task_model(model, task_id)
+        for task_id in ('account', 'transaction')
+    }
+    
     # Load feature lists
     account_features_path = os.path.join(FEATURES_DIR, "AccountLevel_top15_features.json")
     transaction_features_path = os.path.join(FEATURES_DIR, "TransactionLevel_top15_features.json")
@@ -141,6 +184,7 @@ def load_model() -> Tuple[MTL_MLP, List[str], List[str]]:
     TRANSACTION_FEATURE_NAMES = _feature_name_list(TRANSACTION_FEATURES)
     
     _model_instance = model
+    _task_models.update(task_models)
     _account_feature_names = ACCOUNT_FEATURE_NAMES
     _transaction_feature_names = TRANSACTION_FEATURE_NAMES
     
@@ -152,6 +196,12 @@ def get_model() -> MTL_MLP:
         load_model()
     return _model_instance
 
+def get_task_model(task_id: str) -> torch.nn.Module:
+    """Get the compiled single-task model for 'account' or 'transaction'"""
+    if task_id not in _task_models:
+        load_model()
+    return _task_models[task_id]
+
 def get_feature_names() -> Tuple[List[str], List[str]]:
     """Get feature names"""
     if _account_feature_names is None or _transaction_feature_names is None:
@@ -187,7 +237,8 @@ def scale_features(features: np.ndarray, task: str = 'account') -> np.ndarray:
         task: 'account' or 'transaction'
     
     Returns:
-        Scaled features (same shape as input)
+        Scaled float32 features (same shape as input), ready to hand to
+        torch.from_numpy without another conversion
     """
     # Load training statistics if available
     stats = load_training_statistics()
@@ -230,7 +281,7 @@ def scale_features(features: np.ndarray, task: str = 'account') -> np.ndarray:
             if is_1d:
                 scaled = scaled.flatten()
             
-            return scaled
+            return scaled.astype(np.float32, copy=False)
     
     # Fallback: Use sample-based scaling (only works with multiple samples)
     print(f"⚠️  No training statistics available for {task}. Using fallback scaling.")
@@ -268,5 +319,4 @@ def scale_features(features: np.ndarray, task: str = 'account') -> np.ndarray:
     if is_1d:
         scaled = scaled.flatten()
     
-    return scaled
-
+    return scaled.astype(np.float32, copy=False)
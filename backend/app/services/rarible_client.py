@@ -4,6 +4,7 @@ Fetches NFT collection data from Rarible API
 """
 import os
 import httpx
+import orjson
 import logging
 import time
 from typing import Optional, Dict, Any, Set
@@ -59,7 +60,7 @@ async def rarible_get(path: str, params: Optional[Dict[str, Any]] = None, allow_
             logger.debug(f"⏱️ [TIMING] Rarible API {path}: {elapsed:.2f}s")
         
         r.raise_for_status()
-        return r.json()
+        return orjson.loads(r.content)
 
 async def items_by_owner(
     owner: str,
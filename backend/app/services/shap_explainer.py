@@ -2,9 +2,13 @@
 SHAP Explainer
 Provides SHAP-based explanations for model predictions
 """
+import copy
+import inspect
+import threading
 import numpy as np
 import shap
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 from app.services.model import MTL_MLP
 
 
@@ -22,7 +26,7 @@ def make_model_predict_fn(model: MTL_MLP, device="cpu", task_id="transaction", a
             x_arr = x_arr.reshape(1, -1)
 
         import torch
-        with torch.no_grad():
+        with torch.inference_mode():
             xt = torch.from_numpy(x_arr).to(device)
             out = model(xt, task_id=task_id)
             # out may be a tensor of shape (n,1) or (n,)
@@ -39,12 +43,25 @@ def make_model_predict_fn(model: MTL_MLP, device="cpu", task_id="transaction", a
 
 
 class SHAPExplainer:
-    def __init__(self, model: MTL_MLP, background_data_size=100, device="cpu"):
+    def __init__(self, model: MTL_MLP, background_data_size=100, device="cpu",
+                 background_data: Optional[np.ndarray] = None, result_cache_size=256, max_evals=500):
         self.model = model
         self.background_data_size = background_data_size
         self.background_data = None
         self.device = device
+        self.max_evals = max_evals  # model evaluations per explained row (shap's default budget)
         self.explainers = {}  # cache explainers per task
+        self.predict_fns = {}  # cache predict functions per task
+        self.expected_values = {}  # cache mean model output over the background per task
+        # LRU of explanations keyed by (task, sigmoid, exact feature rows); explanations
+        # run on a worker pool, so every access goes through the lock
+        self.result_cache_size = result_cache_size
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+
+        # Fix the background up front so explainers and baselines are built once
+        if background_data is not None:
+            self.prepare_background_data(background_data)
 
     def prepare_background_data(self, sample_features):
         """Prepare a background dataset for SHAP using representative samples (numpy array)."""
@@ -67,7 +84,16 @@ class SHAPExplainer:
             if old_background_shape is not None:
                 # Background data changed, clear cache
                 self.explainers = {}
-            self.background_data = new_background
+                self.expected_values = {}
+                with self._results_lock:
+                    self._results.clear()
+            self.background_data = new_background.astype(np.float32)
+
+    @staticmethod
+    def _accepts_eval_budget(explainer) -> bool:
+        """Whether this explainer's __call__ takes max_evals and batch_size (sampling explainers do, Tree/Linear don't)."""
+        params = inspect.signature(explainer.__call__).parameters
+        return "max_evals" in params and "batch_size" in params
 
     def explain_prediction(self, features, task_id, feature_names, apply_sigmoid=True, tol=1e-6):
         """
@@ -84,14 +110,29 @@ class SHAPExplainer:
 
         # Prepare background if missing
         if self.background_data is None:
-            # Use the provided features as background fallback
-            self.prepare_background_data(X)
-
-        # Create predict function for this task
-        predict_fn = make_model_predict_fn(self.model, device=self.device, task_id=task_id, apply_sigmoid=apply_sigmoid)
-
-        # Cache explainer per task/settings key
+            # Scaled features are standardized against the training data, so the
+            # zero vector is the training mean. Using the explained sample itself
+            # as background would make every SHAP value zero.
+            self.prepare_background_data(np.zeros((1, X.shape[1]), dtype=np.float32))
+
+        # Reuse the explanation for rows seen before
+        result_key = (task_id, apply_sigmoid, X.shape, X.tobytes())
+        with self._results_lock:
+            cached = self._results.get(result_key)
+            if cached is not None:
+                self._results.move_to_end(result_key)
+        if cached is not None:
+            # Callers get their own copy so mutating it cannot corrupt the cache
+            return copy.deepcopy(cached)
+
+        # Cache predict function and explainer per task/settings key
         cache_key = (task_id, apply_sigmoid)
+        if cache_key not in self.predict_fns:
+            self.predict_fns[cache_key] = make_model_predict_fn(
+                self.model, device=self.device, task_id=task_id, apply_sigmoid=apply_sigmoid
+            )
+        predict_fn = self.predict_fns[cache_key]
+
         if cache_key not in self.explainers:
             # Use shap.Explainer which will pick an appropriate algorithm
             try:
@@ -102,8 +143,17 @@ class SHAPExplainer:
 
         explainer = self.explainers[cache_key]
 
-        # Compute SHAP values
-        shap_values = explainer(X)
+        # Baseline expectation over the fixed background, computed once per task
+        if cache_key not in self.expected_values:
+            self.expected_values[cache_key] = float(predict_fn(self.background_data).mean())
+
+        # Compute SHAP values. batch_size=max_evals hands every coalition of a row
+        # (x background) to predict_fn at once, so the MLP runs one large GEMM per
+        # row instead of many small ones.
+        if self._accepts_eval_budget(explainer):
+            shap_values = explainer(X, max_evals=self.max_evals, batch_size=self.max_evals)
+        else:
+            shap_values = explainer(X)
 
         # Extract arrays and expected/base value robustly
         values = np.asarray(shap_values.values)
@@ -135,7 +185,7 @@ class SHAPExplainer:
         # Derive a scalar expected value for reconstruction.
         expected_scalar = 0.0
         if expected_value is None:
-            expected_scalar = 0.0
+            expected_scalar = self.expected_values[cache_key]
         else:
             try:
                 ev = np.asarray(expected_value)
@@ -171,7 +221,7 @@ class SHAPExplainer:
         fi.sort(key=lambda x: abs(x["shap_value"]), reverse=True)
         top_5_fi = fi[:5]
 
-        return {
+        result = {
             "expected_value": expected_scalar,
             "max_additivity_diff": max_diff,
             "preds": preds.tolist(),
@@ -179,3 +229,9 @@ class SHAPExplainer:
             "raw_shap_values": values.tolist()
         }
 
+        with self._results_lock:
+            self._results[result_key] = copy.deepcopy(result)
+            if len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+        return result
+
@@ -0,0 +1,100 @@
+"""
+Test script for concurrent gradient-based explanations
+Runs FastFeatureExplainer from several threads at once, the way
+DetectionService's explainer pool does under concurrent explain=True requests.
+
+Each scenario runs in its own process, because the failure mode is a segfault:
+1. Legacy explainer (model.zero_grad() + backward() on the shared model) - expected to crash
+2. Current explainer (torch.autograd.grad on the input) - must match the serial run exactly
+"""
+import multiprocessing
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+N_EXPLANATIONS = 400
+N_WORKERS = 4
+
+
+def legacy_explain(model, features: np.ndarray, task_id: str) -> list:
+    """Old explain_prediction gradient step: writes the shared parameters' .grad"""
+    X = torch.tensor(features, dtype=torch.float32, requires_grad=True)
+    output = model(X, task_id=task_id).squeeze()
+    model.zero_grad()
+    output.backward(retain_graph=True)
+    return torch.abs(X.grad).squeeze().tolist()
+
+
+def run_scenario(mode: str, n_workers: int):
+    """Run N_EXPLANATIONS serially, then on a thread pool; exit 1 on mismatch"""
+    from app.services.model_loader import get_model, get_feature_names
+    from app.services.fast_feature_explainer import FastFeatureExplainer
+
+    model = get_model()
+    account_feature_names, _ = get_feature_names()
+    explainer = FastFeatureExplainer(model, device="cpu")
+
+    # Scaled features are standardized, so draw rows around the training mean
+    rng = np.random.default_rng(0)
+    rows = rng.standard_normal((N_EXPLANATIONS, 1, len(account_feature_names))).astype(np.float32)
+
+    if mode == "legacy":
+        explain = lambda row: legacy_explain(model, row, "account")
+    else:
+        explain = lambda row: explainer.explain_prediction(row, "account", account_feature_names)["raw_importance_scores"]
+
+    serial = [explain(row) for row in rows]
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        concurrent = list(pool.map(explain, rows))
+
+    sys.exit(0 if concurrent == serial else 1)
+
+
+def test_concurrent_explanations(mode: str, n_workers: int) -> int:
+    """
+    Run one scenario in a child process
+
+    Returns: child exit code (0 = identical to serial, 1 = mismatch, negative = killed by signal)
+    """
+    print("=" * 80)
+    print(f"{mode.upper()} explainer: {N_EXPLANATIONS} explanations on {n_workers} threads")
+    print("=" * 80)
+
+    proc = multiprocessing.get_context("spawn").Process(target=run_scenario, args=(mode, n_workers))
+    proc.start()
+    proc.join()
+
+    if proc.exitcode == 0:
+        print("✓ Concurrent results identical to serial run")
+    elif proc.exitcode == 1:
+        print("❌ Concurrent results differ from serial run")
+    else:
+        print(f"❌ Process crashed (exit code {proc.exitcode})")
+    return proc.exitcode
+
+
+def main():
+    """Reproduce the legacy crash, then check the current explainer is thread-safe"""
+    print("\n" + "=" * 80)
+    print("CONCURRENT EXPLANATION TEST")
+    print("=" * 80)
+
+    legacy_code = test_concurrent_explanations("legacy", N_WORKERS)
+    if legacy_code == 0:
+        print("⚠ Legacy explainer did not crash on this run (the race is timing-dependent)")
+
+    failed = False
+    for n_workers in (1, 2, N_WORKERS):
+        if test_concurrent_explanations("current", n_workers) != 0:
+            failed = True
+
+    print("\n" + "=" * 80)
+    print("❌ Current explainer is not thread-safe" if failed else "✓ Current explainer is thread-safe")
+    print("=" * 80)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()